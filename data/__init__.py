@@ -44,11 +44,21 @@ def create_dataloader(opt):
     instance.initialize(opt)
     print("dataset [%s] of size %d was created" %
           (type(instance).__name__, len(instance)))
+    # only passed when set, since older versions of torch don't know them
+    worker_options = {}
+    assert int(opt.nThreads) > 0 or not (opt.persistent_workers or opt.prefetch_factor is not None), \
+        "--persistent_workers and --prefetch_factor require data loading workers. Please set --nThreads > 0."
+    if opt.persistent_workers:
+        worker_options['persistent_workers'] = True
+    if opt.prefetch_factor is not None:
+        worker_options['prefetch_factor'] = opt.prefetch_factor
     dataloader = torch.utils.data.DataLoader(
         instance,
         batch_size=opt.batchSize,
         shuffle=not opt.serial_batches,
         num_workers=int(opt.nThreads),
-        drop_last=opt.isTrain
+        drop_last=opt.isTrain,
+        pin_memory=len(opt.gpu_ids) > 0 and not opt.no_pin_memory,
+        **worker_options
     )
     return dataloader
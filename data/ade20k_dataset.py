@@ -48,6 +48,6 @@ class ADE20KDataset(Pix2pixDataset):
     # In ADE20k, 'unknown' label is of value 0.
     # Change the 'unknown' label to the last label to match other datasets.
     def postprocess(self, input_dict):
-        label = input_dict['label']
+        label = input_dict['label'].long()
         label = label - 1
         label[label == -1] = self.opt.label_nc
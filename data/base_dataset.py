@@ -8,6 +8,7 @@ from PIL import Image
 import torchvision.transforms as transforms
 import numpy as np
 import random
+import torch
 
 
 class BaseDataset(data.Dataset):
@@ -44,6 +45,22 @@ def get_params(opt, size):
     return {'crop_pos': (x, y), 'flip': flip}
 
 
+# Returns True if the output of get_transform() depends on |params|,
+# i.e. on the random crop position or flip drawn in get_params().
+def transform_uses_params(opt):
+    return 'crop' in opt.preprocess_mode or (opt.isTrain and not opt.no_flip)
+
+
+# Returns the (w, h) size that get_transform() resizes every image to,
+# or None if the size depends on the size of the image
+def get_fixed_load_size(opt):
+    if 'resize' in opt.preprocess_mode:
+        return (opt.load_size, opt.load_size)
+    if opt.preprocess_mode == 'fixed':
+        return (opt.crop_size, round(opt.crop_size / opt.aspect_ratio))
+    return None
+
+
 def get_transform(opt, params, method=Image.BICUBIC, normalize=True, toTensor=True):
     transform_list = []
     if 'resize' in opt.preprocess_mode:
@@ -69,19 +86,47 @@ def get_transform(opt, params, method=Image.BICUBIC, normalize=True, toTensor=Tr
     if opt.isTrain and not opt.no_flip:
         transform_list.append(transforms.Lambda(lambda img: __flip(img, params['flip'])))
 
-    if toTensor:
+    # |normalize| only applies to the tensor created by |toTensor|
+    if toTensor and normalize:
+        # equivalent to ToTensor() followed by Normalize((0.5, 0.5, 0.5), (0.5, 0.5, 0.5))
+        transform_list += [transforms.Lambda(lambda img: __to_normalized_tensor(img))]
+    elif toTensor:
         transform_list += [transforms.ToTensor()]
-
-    if normalize:
-        transform_list += [transforms.Normalize((0.5, 0.5, 0.5),
-                                                (0.5, 0.5, 0.5))]
     return transforms.Compose(transform_list)
 
 
+# Same as get_transform() for label and instance maps. They are resized with
+# nearest neighbor and converted to a tensor that keeps the integer values
+# of the map, e.g. uint8 for 'L' and 'P' images, instead of floats in [0, 1].
+def get_label_transform(opt, params):
+    transform = get_transform(opt, params, method=Image.NEAREST, normalize=False, toTensor=False)
+    transform.transforms.append(transforms.Lambda(lambda img: __to_int_tensor(img)))
+    return transform
+
+
 def normalize():
     return transforms.Normalize((0.5, 0.5, 0.5), (0.5, 0.5, 0.5))
 
 
+def __to_normalized_tensor(img):
+    # maps [0, 255] to [-1, 1] with a single uint8 to float conversion,
+    # skipping the float copies made by ToTensor's division and Normalize
+    return __to_int_tensor(img).float().mul_(2.0 / 255.0).sub_(1.0)
+
+
+# converts a PIL image to a CxHxW tensor without changing its values
+def __to_int_tensor(img):
+    array = np.array(img)
+    if array.dtype == np.uint16:
+        # e.g. 16-bit instance maps, which torch has no dtype for
+        array = array.astype(np.int32)
+    if array.ndim == 2:
+        array = array[np.newaxis]
+    else:
+        array = np.ascontiguousarray(array.transpose((2, 0, 1)))
+    return torch.from_numpy(array)
+
+
 def __resize(img, w, h, method=Image.BICUBIC):
     return img.resize((w, h), method)
 
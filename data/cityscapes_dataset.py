@@ -43,9 +43,7 @@ class CityscapesDataset(Pix2pixDataset):
 
         return label_paths, image_paths, instance_paths
 
-    def paths_match(self, path1, path2):
-        name1 = os.path.basename(path1)
-        name2 = os.path.basename(path2)
+    def paired_name(self, path):
+        name = os.path.basename(path)
         # compare the first 3 components, [city]_[id1]_[id2]
-        return '_'.join(name1.split('_')[:3]) == \
-            '_'.join(name2.split('_')[:3])
+        return '_'.join(name.split('_')[:3])
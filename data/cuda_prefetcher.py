@@ -0,0 +1,43 @@
+"""
+Copyright (C) 2019 NVIDIA Corporation.  All rights reserved.
+Licensed under the CC BY-NC-SA 4.0 license (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode).
+"""
+
+import torch
+
+
+# Wraps a DataLoader and copies every batch to the current GPU on a side
+# CUDA stream, so that the transfer of the next batch overlaps with the
+# computation on the current one. The DataLoader should use pinned memory,
+# otherwise the copies are not asynchronous.
+class CUDAPrefetcher():
+    def __init__(self, dataloader):
+        self.dataloader = dataloader
+        self.stream = torch.cuda.Stream()
+
+    def __len__(self):
+        return len(self.dataloader)
+
+    def __iter__(self):
+        batches = iter(self.dataloader)
+        next_batch = self.preload(batches)
+        while next_batch is not None:
+            current_stream = torch.cuda.current_stream()
+            current_stream.wait_stream(self.stream)
+            batch = next_batch
+            # the tensors were allocated on the side stream, but are used
+            # on the current one from now on
+            for v in batch.values():
+                if torch.is_tensor(v):
+                    v.record_stream(current_stream)
+            next_batch = self.preload(batches)
+            yield batch
+
+    def preload(self, batches):
+        try:
+            batch = next(batches)
+        except StopIteration:
+            return None
+        with torch.cuda.stream(self.stream):
+            return {k: v.cuda(non_blocking=True) if torch.is_tensor(v) else v
+                    for k, v in batch.items()}
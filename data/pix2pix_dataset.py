@@ -3,10 +3,12 @@ Copyright (C) 2019 NVIDIA Corporation.  All rights reserved.
 Licensed under the CC BY-NC-SA 4.0 license (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode).
 """
 
-from data.base_dataset import BaseDataset, get_params, get_transform
+from data.base_dataset import BaseDataset, get_params, get_transform, get_label_transform, get_fixed_load_size, transform_uses_params
 from PIL import Image
 import util.util as util
 import os
+import numpy as np
+import torch
 
 
 class Pix2pixDataset(BaseDataset):
@@ -14,6 +16,16 @@ class Pix2pixDataset(BaseDataset):
     def modify_commandline_options(parser, is_train):
         parser.add_argument('--no_pairing_check', action='store_true',
                             help='If specified, skip sanity check of correct label-image file pairing')
+        parser.add_argument('--cache_labels', action='store_true',
+                            help='If specified, keep the transformed label maps in memory after they are first loaded. Only used when the transform is deterministic, i.e. no cropping and no flipping.')
+        parser.add_argument('--image_memmap', type=str, default='',
+                            help='If specified, read the preprocessed real images from this .npy file written by preprocess.py instead of decoding them. Requires a deterministic transform, i.e. no cropping and no flipping.')
+        parser.add_argument('--jpeg_draft', action='store_true',
+                            help='If specified, decode JPEG images at a reduced scale (1/2, 1/4 or 1/8) when they are downscaled anyway. Only used when --preprocess_mode resizes to a fixed size.')
+        parser.add_argument('--preload_labels', action='store_true',
+                            help='If specified, decode all label maps once at startup and keep them in memory. Works with any preprocessing, but needs about width x height bytes per label map.')
+        parser.add_argument('--turbojpeg', action='store_true',
+                            help='If specified, decode JPEG images with libjpeg-turbo through PyTurboJPEG instead of PIL. Requires PyTurboJPEG>=1.4.0 installed.')
         return parser
 
     def initialize(self, opt):
@@ -31,7 +43,12 @@ class Pix2pixDataset(BaseDataset):
         instance_paths = instance_paths[:opt.max_dataset_size]
 
         if not opt.no_pairing_check:
-            for path1, path2 in zip(label_paths, image_paths):
+            label_names = [self.paired_name(p) for p in label_paths]
+            image_names = [self.paired_name(p) for p in image_paths]
+            n = min(len(label_names), len(image_names))
+            if label_names[:n] != image_names[:n]:
+                i = next(i for i in range(n) if label_names[i] != image_names[i])
+                path1, path2 = label_paths[i], image_paths[i]
                 assert self.paths_match(path1, path2), \
                     "The label-image pair (%s, %s) do not look like the right pair because the filenames are quite different. Are you sure about the pairing? Please see data/pix2pix_dataset.py to see what is going on, and use --no_pairing_check to bypass this." % (path1, path2)
 
@@ -42,6 +59,28 @@ class Pix2pixDataset(BaseDataset):
         size = len(self.label_paths)
         self.dataset_size = size
 
+        # decoded label maps, so that they are read from disk only once
+        self.label_images = None
+        if opt.preload_labels:
+            self.label_images = [self.load_label(p) for p in self.label_paths]
+
+        # label maps are cached by index
+        use_cache = opt.cache_labels and not transform_uses_params(opt)
+        self.label_cache = {} if use_cache else None
+
+        # (transform_label, transform_image), built on first use when they
+        # don't depend on the per-sample params
+        self.fixed_transforms = None
+
+        # opened lazily, so that every DataLoader worker maps the file itself
+        self.image_memmap = None
+        if opt.image_memmap:
+            assert not transform_uses_params(opt), \
+                "--image_memmap cannot be used with random cropping or flipping. Use --preprocess_mode without 'crop' and --no_flip."
+
+        # likewise, the TurboJPEG decoder can't be pickled into the workers
+        self.turbojpeg = None
+
     def get_paths(self, opt):
         label_paths = []
         image_paths = []
@@ -49,30 +88,44 @@ class Pix2pixDataset(BaseDataset):
         assert False, "A subclass of Pix2pixDataset must override self.get_paths(self, opt)"
         return label_paths, image_paths, instance_paths
 
+    # Returns the part of the filename that must be identical
+    # for a label map and its real image
+    def paired_name(self, path):
+        return os.path.splitext(os.path.basename(path))[0]
+
     def paths_match(self, path1, path2):
-        filename1_without_ext = os.path.splitext(os.path.basename(path1))[0]
-        filename2_without_ext = os.path.splitext(os.path.basename(path2))[0]
-        return filename1_without_ext == filename2_without_ext
+        return self.paired_name(path1) == self.paired_name(path2)
 
     def __getitem__(self, index):
         # Label Image
         label_path = self.label_paths[index]
-        label = Image.open(label_path)
-        params = get_params(self.opt, label.size)
-        transform_label = get_transform(self.opt, params, method=Image.NEAREST, normalize=False)
-        label_tensor = transform_label(label) * 255.0
-        label_tensor[label_tensor == 255] = self.opt.label_nc  # 'unknown' is opt.label_nc
+        if self.label_cache is not None and index in self.label_cache:
+            # the cache is only used with the fixed transforms,
+            # which don't depend on the size of the label map
+            transform_label, transform_image = self.get_transforms(None)
+            label_tensor = self.label_cache[index]
+        else:
+            if self.label_images is not None:
+                label = self.label_images[index]
+            else:
+                label = Image.open(label_path)
+            transform_label, transform_image = self.get_transforms(label.size)
+            # kept as uint8, Pix2PixModel converts it when it builds the one-hot map
+            label_tensor = transform_label(label)
+            label_tensor.masked_fill_(label_tensor == 255, self.opt.label_nc)  # 'unknown' is opt.label_nc
+            if self.label_cache is not None:
+                self.label_cache[index] = label_tensor
 
         # input image (real images)
         image_path = self.image_paths[index]
         assert self.paths_match(label_path, image_path), \
             "The label_path %s and image_path %s don't match." % \
             (label_path, image_path)
-        image = Image.open(image_path)
-        image = image.convert('RGB')
-
-        transform_image = get_transform(self.opt, params)
-        image_tensor = transform_image(image)
+        if self.opt.image_memmap:
+            image_tensor = torch.from_numpy(self.get_image_memmap()[index].astype(np.float32))
+        else:
+            image = self.load_image(image_path)
+            image_tensor = transform_image(image)
 
         # if using instance maps
         if self.opt.no_instance:
@@ -80,11 +133,7 @@ class Pix2pixDataset(BaseDataset):
         else:
             instance_path = self.instance_paths[index]
             instance = Image.open(instance_path)
-            if instance.mode == 'L':
-                instance_tensor = transform_label(instance) * 255
-                instance_tensor = instance_tensor.long()
-            else:
-                instance_tensor = transform_label(instance)
+            instance_tensor = transform_label(instance)
 
         input_dict = {'label': label_tensor,
                       'instance': instance_tensor,
@@ -97,6 +146,130 @@ class Pix2pixDataset(BaseDataset):
 
         return input_dict
 
+    # Returns the label and image transforms for a sample whose label map
+    # has the given |size|
+    def get_transforms(self, size):
+        if transform_uses_params(self.opt):
+            params = get_params(self.opt, size)
+            transform_label = get_label_transform(self.opt, params)
+            transform_image = get_transform(self.opt, params)
+            return transform_label, transform_image
+
+        # without cropping and flipping, the same transforms apply to every
+        # sample, and the random params are never used
+        if self.fixed_transforms is None:
+            transform_label = get_label_transform(self.opt, None)
+            transform_image = get_transform(self.opt, None)
+            self.fixed_transforms = (transform_label, transform_image)
+        return self.fixed_transforms
+
+    def load_label(self, label_path):
+        with Image.open(label_path) as label:
+            label.load()
+        return label
+
+    def load_image(self, image_path):
+        if self.opt.turbojpeg and image_path.lower().endswith(('.jpg', '.jpeg')):
+            image = self.decode_turbojpeg(image_path)
+            if image is not None:
+                return image
+
+        image = Image.open(image_path)
+        if self.opt.jpeg_draft and image.format == 'JPEG':
+            load_size = get_fixed_load_size(self.opt)
+            if load_size is not None:
+                # libjpeg picks the smallest scale that is still
+                # at least as large as load_size
+                image.draft('RGB', load_size)
+        if image.mode != 'RGB':
+            # convert() always decodes into a new copy, even for RGB inputs
+            image = image.convert('RGB')
+        return image
+
+    # Returns None for files that TurboJPEG can't decode or convert to RGB,
+    # e.g. CMYK JPEGs or non-JPEG files with a .jpg extension,
+    # which are then decoded by PIL instead
+    def decode_turbojpeg(self, image_path):
+        import turbojpeg
+        if self.turbojpeg is None:
+            self.turbojpeg = turbojpeg.TurboJPEG()
+
+        with open(image_path, 'rb') as f:
+            jpeg = f.read()
+        try:
+            width, height, _, colorspace = self.turbojpeg.decode_header(jpeg)
+        except OSError:
+            return None
+        if colorspace in (turbojpeg.TJCS_CMYK, turbojpeg.TJCS_YCCK):
+            return None
+
+        # same reduced-scale decoding as Image.draft() for --jpeg_draft
+        denom = 1
+        load_size = get_fixed_load_size(self.opt)
+        if self.opt.jpeg_draft and load_size is not None:
+            scale = min(width // load_size[0], height // load_size[1])
+            denom = max(d for d in (8, 4, 2, 1) if d <= max(scale, 1))
+
+        try:
+            image = self.turbojpeg.decode(jpeg, pixel_format=turbojpeg.TJPF_RGB,
+                                          scaling_factor=(1, denom))
+        except OSError:
+            return None
+        return Image.fromarray(image)
+
+    def image_memmap_paths_file(self, path):
+        return path + '.paths.txt'
+
+    def image_memmap_options_file(self, path):
+        return path + '.opt.txt'
+
+    # the options that change the output of the image transform
+    def image_memmap_options(self):
+        keys = ['preprocess_mode', 'load_size', 'crop_size', 'aspect_ratio', 'jpeg_draft']
+        return ['%s: %s' % (k, getattr(self.opt, k)) for k in keys]
+
+    def get_image_memmap(self):
+        if self.image_memmap is None:
+            path = self.opt.image_memmap
+            with open(self.image_memmap_paths_file(path), 'r') as f:
+                paths = f.read().splitlines()
+            assert paths == self.image_paths, \
+                "The images stored in %s do not match the current dataset. Please regenerate it with preprocess.py." % path
+            with open(self.image_memmap_options_file(path), 'r') as f:
+                options = f.read().splitlines()
+            assert options == self.image_memmap_options(), \
+                "The images stored in %s were preprocessed with different options (%s) than the current ones (%s). Please regenerate it with preprocess.py." % \
+                (path, ', '.join(options), ', '.join(self.image_memmap_options()))
+            self.image_memmap = np.load(path, mmap_mode='r')
+        return self.image_memmap
+
+    # Writes the transformed real images of the whole dataset to |path|
+    # as a single float16 array of shape (N, C, H, W), along with the
+    # list of image paths and the preprocessing options it was created from.
+    def write_image_memmap(self, path):
+        assert not transform_uses_params(self.opt), \
+            "The image memmap can only be created for a deterministic transform, i.e. no cropping and no flipping."
+        assert len(self.image_paths) > 0, "The dataset contains no images."
+        transform_image = get_transform(self.opt, None)
+        out = None
+        for i, image_path in enumerate(self.image_paths):
+            image_tensor = transform_image(self.load_image(image_path))
+            if out is None:
+                out = np.lib.format.open_memmap(
+                    path, mode='w+', dtype=np.float16,
+                    shape=(len(self.image_paths),) + tuple(image_tensor.size()))
+            assert tuple(image_tensor.size()) == out.shape[1:], \
+                "The image %s has size %s after preprocessing, but %s is expected. Please use a --preprocess_mode with a fixed output size." % \
+                (image_path, tuple(image_tensor.size()), out.shape[1:])
+            out[i] = image_tensor.numpy()
+            if i % 100 == 0:
+                print("{} / {}".format(i, len(self.image_paths)))
+        out.flush()
+        with open(self.image_memmap_paths_file(path), 'w') as f:
+            f.write('\n'.join(self.image_paths))
+        with open(self.image_memmap_options_file(path), 'w') as f:
+            f.write('\n'.join(self.image_memmap_options()))
+
     def postprocess(self, input_dict):
         return input_dict
 
@@ -49,7 +49,10 @@ def create_network(cls, opt):
 
 def define_G(opt):
     netG_cls = find_network_using_name(opt.netG, 'generator')
-    return create_network(netG_cls, opt)
+    netG = create_network(netG_cls, opt)
+    if opt.channels_last:
+        netG = netG.to(memory_format=torch.channels_last)
+    return netG
 
 
 def define_D(opt):
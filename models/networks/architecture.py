@@ -40,10 +40,11 @@ class SPADEResnetBlock(nn.Module):
 
         # define normalization layers
         spade_config_str = opt.norm_G.replace('spectral', '')
-        self.norm_0 = SPADE(spade_config_str, fin, opt.semantic_nc)
-        self.norm_1 = SPADE(spade_config_str, fmiddle, opt.semantic_nc)
+        separable = opt.spade_separable
+        self.norm_0 = SPADE(spade_config_str, fin, opt.semantic_nc, separable)
+        self.norm_1 = SPADE(spade_config_str, fmiddle, opt.semantic_nc, separable)
         if self.learned_shortcut:
-            self.norm_s = SPADE(spade_config_str, fin, opt.semantic_nc)
+            self.norm_s = SPADE(spade_config_str, fin, opt.semantic_nc, separable)
 
     # note the resnet block with SPADE also takes in |seg|,
     # the semantic segmentation map as input
@@ -19,6 +19,8 @@ class SPADEGenerator(BaseNetwork):
         parser.add_argument('--num_upsampling_layers',
                             choices=('normal', 'more', 'most'), default='normal',
                             help="If 'more', adds upsampling layer between the two middle resnet blocks. If 'most', also add one more upsampling + resnet layer at the end of the generator")
+        parser.add_argument('--spade_separable', action='store_true',
+                            help='If specified, the first conv on the segmentation map in each SPADE layer is a depthwise conv followed by a 1x1 conv, which needs far fewer multiply-adds. Changes the architecture, so it must match between training and testing.')
 
         return parser
 
@@ -88,35 +90,47 @@ class SPADEGenerator(BaseNetwork):
             x = F.interpolate(seg, size=(self.sh, self.sw))
             x = self.fc(x)
 
-        x = self.head_0(x, seg)
+        # the segmentation map is resized once per resolution and shared
+        # by all SPADE layers of the resnet blocks at that resolution
+        segs = {}
+
+        x = self.head_0(x, self.resize_seg(seg, x, segs))
 
         x = self.up(x)
-        x = self.G_middle_0(x, seg)
+        x = self.G_middle_0(x, self.resize_seg(seg, x, segs))
 
         if self.opt.num_upsampling_layers == 'more' or \
            self.opt.num_upsampling_layers == 'most':
             x = self.up(x)
 
-        x = self.G_middle_1(x, seg)
+        x = self.G_middle_1(x, self.resize_seg(seg, x, segs))
 
         x = self.up(x)
-        x = self.up_0(x, seg)
+        x = self.up_0(x, self.resize_seg(seg, x, segs))
         x = self.up(x)
-        x = self.up_1(x, seg)
+        x = self.up_1(x, self.resize_seg(seg, x, segs))
         x = self.up(x)
-        x = self.up_2(x, seg)
+        x = self.up_2(x, self.resize_seg(seg, x, segs))
         x = self.up(x)
-        x = self.up_3(x, seg)
+        x = self.up_3(x, self.resize_seg(seg, x, segs))
 
         if self.opt.num_upsampling_layers == 'most':
             x = self.up(x)
-            x = self.up_4(x, seg)
+            x = self.up_4(x, self.resize_seg(seg, x, segs))
 
         x = self.conv_img(F.leaky_relu(x, 2e-1))
         x = F.tanh(x)
 
         return x
 
+    # returns |seg| resized to the spatial size of |x|, reusing the
+    # resized maps stored in |cache|
+    def resize_seg(self, seg, x, cache):
+        size = tuple(x.size()[2:])
+        if size not in cache:
+            cache[size] = F.interpolate(seg, size=size, mode='nearest')
+        return cache[size]
+
 
 class Pix2PixHDGenerator(BaseNetwork):
     @staticmethod
@@ -63,8 +63,10 @@ def get_nonspade_norm_layer(opt, norm_type='instance'):
 # Also, the other arguments are
 # |norm_nc|: the #channels of the normalized activations, hence the output dim of SPADE
 # |label_nc|: the #channels of the input semantic map, hence the input dim of SPADE
+# |separable|: if True, the first conv on the semantic map is factored into a
+#              depthwise ks x ks conv and a pointwise 1x1 conv
 class SPADE(nn.Module):
-    def __init__(self, config_text, norm_nc, label_nc):
+    def __init__(self, config_text, norm_nc, label_nc, separable=False):
         super().__init__()
 
         assert config_text.startswith('spade')
@@ -86,10 +88,17 @@ class SPADE(nn.Module):
         nhidden = 128
 
         pw = ks // 2
-        self.mlp_shared = nn.Sequential(
-            nn.Conv2d(label_nc, nhidden, kernel_size=ks, padding=pw),
-            nn.ReLU()
-        )
+        if separable:
+            self.mlp_shared = nn.Sequential(
+                nn.Conv2d(label_nc, label_nc, kernel_size=ks, padding=pw, groups=label_nc),
+                nn.Conv2d(label_nc, nhidden, kernel_size=1),
+                nn.ReLU()
+            )
+        else:
+            self.mlp_shared = nn.Sequential(
+                nn.Conv2d(label_nc, nhidden, kernel_size=ks, padding=pw),
+                nn.ReLU()
+            )
         self.mlp_gamma = nn.Conv2d(nhidden, norm_nc, kernel_size=ks, padding=pw)
         self.mlp_beta = nn.Conv2d(nhidden, norm_nc, kernel_size=ks, padding=pw)
 
@@ -99,12 +108,14 @@ class SPADE(nn.Module):
         normalized = self.param_free_norm(x)
 
         # Part 2. produce scaling and bias conditioned on semantic map
-        segmap = F.interpolate(segmap, size=x.size()[2:], mode='nearest')
+        if segmap.size()[2:] != x.size()[2:]:
+            segmap = F.interpolate(segmap, size=x.size()[2:], mode='nearest')
         actv = self.mlp_shared(segmap)
         gamma = self.mlp_gamma(actv)
         beta = self.mlp_beta(actv)
 
-        # apply scale and bias
-        out = normalized * (1 + gamma) + beta
+        # apply scale and bias, i.e. normalized * (1 + gamma) + beta,
+        # without materializing (1 + gamma) and the product separately
+        out = torch.addcmul(normalized + beta, normalized, gamma)
 
         return out
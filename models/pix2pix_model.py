@@ -3,6 +3,7 @@ Copyright (C) 2019 NVIDIA Corporation.  All rights reserved.
 Licensed under the CC BY-NC-SA 4.0 license (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode).
 """
 
+import contextlib
 import torch
 import models.networks as networks
 import util.util as util
@@ -41,23 +42,26 @@ class Pix2PixModel(torch.nn.Module):
     def forward(self, data, mode):
         input_semantics, real_image = self.preprocess_input(data)
 
-        if mode == 'generator':
-            g_loss, generated = self.compute_generator_loss(
-                input_semantics, real_image)
-            return g_loss, generated
-        elif mode == 'discriminator':
-            d_loss = self.compute_discriminator_loss(
-                input_semantics, real_image)
-            return d_loss
-        elif mode == 'encode_only':
-            z, mu, logvar = self.encode_z(real_image)
-            return mu, logvar
-        elif mode == 'inference':
-            with torch.no_grad():
-                fake_image, _ = self.generate_fake(input_semantics, real_image)
-            return fake_image
-        else:
-            raise ValueError("|mode| is invalid")
+        # autocast is enabled here rather than around the call in the
+        # trainer, because DataParallel runs each replica in its own thread
+        with self.autocast():
+            if mode == 'generator':
+                g_loss, generated = self.compute_generator_loss(
+                    input_semantics, real_image)
+                return g_loss, generated
+            elif mode == 'discriminator':
+                d_loss = self.compute_discriminator_loss(
+                    input_semantics, real_image)
+                return d_loss
+            elif mode == 'encode_only':
+                z, mu, logvar = self.encode_z(real_image)
+                return mu, logvar
+            elif mode == 'inference':
+                with torch.no_grad():
+                    fake_image, _ = self.generate_fake(input_semantics, real_image)
+                return fake_image
+            else:
+                raise ValueError("|mode| is invalid")
 
     def create_optimizers(self, opt):
         G_params = list(self.netG.parameters())
@@ -118,14 +122,17 @@ class Pix2PixModel(torch.nn.Module):
         bs, _, h, w = label_map.size()
         nc = self.opt.label_nc + 1 if self.opt.contain_dontcare_label \
             else self.opt.label_nc
-        input_label = self.FloatTensor(bs, nc, h, w).zero_()
-        input_semantics = input_label.scatter_(1, label_map, 1.0)
+        input_semantics = self.FloatTensor(bs, self.opt.semantic_nc, h, w).zero_()
+        input_semantics[:, :nc].scatter_(1, label_map, 1.0)
 
-        # concatenate instance map if it exists
+        # write instance map into the last channel if it exists,
+        # instead of concatenating it to the one-hot label map
         if not self.opt.no_instance:
             inst_map = data['instance']
-            instance_edge_map = self.get_edges(inst_map)
-            input_semantics = torch.cat((input_semantics, instance_edge_map), dim=1)
+            input_semantics[:, nc:] = self.get_edges(inst_map)
+
+        if self.opt.channels_last:
+            input_semantics = input_semantics.contiguous(memory_format=torch.channels_last)
 
         return input_semantics, data['image']
 
@@ -247,5 +254,14 @@ class Pix2PixModel(torch.nn.Module):
         eps = torch.randn_like(std)
         return eps.mul(std) + mu
 
+    # bfloat16 has the same exponent range as float32,
+    # so the losses don't need a GradScaler
+    def autocast(self):
+        if self.opt.amp:
+            assert hasattr(torch, 'autocast'), \
+                "--amp requires torch>=1.10, but torch %s is installed" % torch.__version__
+            return torch.autocast('cuda', dtype=torch.bfloat16)
+        return contextlib.nullcontext()
+
     def use_gpu(self):
         return len(self.opt.gpu_ids) > 0
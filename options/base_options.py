@@ -45,6 +45,9 @@ class BaseOptions():
         parser.add_argument('--serial_batches', action='store_true', help='if true, takes images in order to make batches, otherwise takes them randomly')
         parser.add_argument('--no_flip', action='store_true', help='if specified, do not flip the images for data argumentation')
         parser.add_argument('--nThreads', default=0, type=int, help='# threads for loading data')
+        parser.add_argument('--persistent_workers', action='store_true', help='if specified, keep the data loading workers alive between epochs instead of restarting them. Requires --nThreads > 0')
+        parser.add_argument('--prefetch_factor', type=int, default=None, help='# batches loaded in advance by each data loading worker. Requires --nThreads > 0')
+        parser.add_argument('--no_pin_memory', action='store_true', help='if specified, do *not* load batches into pinned memory when training on GPUs')
         parser.add_argument('--max_dataset_size', type=int, default=sys.maxsize, help='Maximum number of samples allowed per dataset. If the dataset directory contains more than max_dataset_size, only a subset is loaded.')
         parser.add_argument('--load_from_opt_file', action='store_true', help='load the options from checkpoints and use that as default')
         parser.add_argument('--cache_filelist_write', action='store_true', help='saves the current filelist into a text file, so that it loads faster')
@@ -60,6 +63,8 @@ class BaseOptions():
         parser.add_argument('--init_variance', type=float, default=0.02, help='variance of the initialization distribution')
         parser.add_argument('--z_dim', type=int, default=256,
                             help="dimension of the latent z vector")
+        parser.add_argument('--amp', action='store_true', help='if specified, run the networks with bfloat16 automatic mixed precision. Requires torch>=1.10 and a GPU with bfloat16 support, e.g. Ampere or newer')
+        parser.add_argument('--channels_last', action='store_true', help='if specified, run the generator in the channels_last (NHWC) memory format, which is faster on GPUs with Tensor Cores')
 
         # for instance-wise features
         parser.add_argument('--no_instance', action='store_true', help='if specified, do *not* add instance map as input')
@@ -0,0 +1,34 @@
+"""
+Copyright (C) 2019 NVIDIA Corporation.  All rights reserved.
+Licensed under the CC BY-NC-SA 4.0 license (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode).
+"""
+
+import sys
+from options.train_options import TrainOptions
+import data
+
+# Decodes, resizes and normalizes all real images of the dataset once, and
+# stores them as a float16 array at --image_memmap. Run it with the same
+# dataset options as train.py, then pass the same --image_memmap to train.py.
+
+
+class PreprocessOptions(TrainOptions):
+    # preprocessing must not overwrite the option file of the experiment
+    # named by --name, which may be an existing training run
+    def save_options(self, opt):
+        pass
+
+
+# parse options
+opt = PreprocessOptions().parse()
+
+# print options to help debugging
+print(' '.join(sys.argv))
+
+assert opt.image_memmap, "Please specify the output file with --image_memmap"
+
+dataset = data.find_dataset_using_name(opt.dataset_mode)()
+dataset.initialize(opt)
+dataset.write_image_memmap(opt.image_memmap)
+
+print('Images were saved to %s' % opt.image_memmap)
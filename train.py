@@ -7,6 +7,7 @@ import sys
 from collections import OrderedDict
 from options.train_options import TrainOptions
 import data
+from data.cuda_prefetcher import CUDAPrefetcher
 from util.iter_counter import IterationCounter
 from util.visualizer import Visualizer
 from trainers.pix2pix_trainer import Pix2PixTrainer
@@ -19,6 +20,9 @@ print(' '.join(sys.argv))
 
 # load the dataset
 dataloader = data.create_dataloader(opt)
+if len(opt.gpu_ids) > 0:
+    # overlap the host-to-device copy of the next batch with training
+    dataloader = CUDAPrefetcher(dataloader)
 
 # create trainer for our model
 trainer = Pix2PixTrainer(opt)